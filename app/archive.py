@@ -0,0 +1,289 @@
+import gzip
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Question, PatientResponse, PersonalizedQuestion, BodyPartSymptom, ArchivedPatient,
+    PERSONALIZED_QUESTION_ID_OFFSET
+)
+
+# Archive configuration
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+
+# Keep IN (...) lists below SQLite's bound parameter limit
+DELETE_BATCH_SIZE = 500
+
+# Records per gzip member; a fallback read decompresses a single member
+ARCHIVE_MEMBER_SIZE = 64
+
+ARCHIVED_MODELS = {
+    "patient_responses": PatientResponse,
+    "body_part_symptoms": BodyPartSymptom,
+    "personalized_questions": PersonalizedQuestion,
+}
+
+
+def partition_path(partition: str, archive_dir: Optional[str] = None) -> str:
+    """Path of the compressed archive file for a month partition (YYYY-MM)"""
+    return os.path.join(archive_dir or ARCHIVE_DIR, f"patient_records_{partition}.jsonl.gz")
+
+
+def _row_to_dict(row) -> Dict[str, Any]:
+    data = {}
+    for column in row.__table__.columns:
+        value = getattr(row, column.name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        data[column.name] = value
+    return data
+
+
+def _last_activity_by_patient(db: Session) -> Dict[int, datetime]:
+    last_activity = {}
+    for model in ARCHIVED_MODELS.values():
+        rows = db.query(model.patient_id, func.max(model.created_at)).group_by(model.patient_id).all()
+        for patient_id, created_at in rows:
+            if created_at is None:
+                continue
+            if patient_id not in last_activity or created_at > last_activity[patient_id]:
+                last_activity[patient_id] = created_at
+    return last_activity
+
+
+def _completed_patient_ids(db: Session) -> set:
+    """Patients who answered every general and every personalized question"""
+    total_general = db.query(Question).filter(Question.is_general == True).count()
+
+    general_answered = dict(db.query(
+        PatientResponse.patient_id, func.count(func.distinct(PatientResponse.question_id))
+    ).join(
+        Question, PatientResponse.question_id == Question.id
+    ).filter(Question.is_general == True).group_by(PatientResponse.patient_id).all())
+
+    personalized_total = dict(db.query(
+        PersonalizedQuestion.patient_id, func.count(PersonalizedQuestion.id)
+    ).group_by(PersonalizedQuestion.patient_id).all())
+
+    personalized_answered = dict(db.query(
+        PatientResponse.patient_id, func.count(func.distinct(PatientResponse.question_id))
+    ).filter(
+        PatientResponse.question_id > PERSONALIZED_QUESTION_ID_OFFSET
+    ).group_by(PatientResponse.patient_id).all())
+
+    completed = set()
+    for patient_id, answered in general_answered.items():
+        if answered < total_general:
+            continue
+        if personalized_answered.get(patient_id, 0) < personalized_total.get(patient_id, 0):
+            continue
+        completed.add(patient_id)
+    return completed
+
+
+def _append_records(path: str, records: List[Dict[str, Any]]) -> Dict[int, Tuple[int, int]]:
+    """Append records as gzip members and return each patient's (offset, length)"""
+    locations = {}
+    with open(path, "ab") as f:
+        f.seek(0, os.SEEK_END)
+        for start in range(0, len(records), ARCHIVE_MEMBER_SIZE):
+            chunk = records[start:start + ARCHIVE_MEMBER_SIZE]
+            # "patient_id" is written first so readers can find a record without parsing the member
+            payload = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in chunk)
+            member = gzip.compress(payload.encode("utf-8"))
+            offset = f.tell()
+            f.write(member)
+            for record in chunk:
+                locations[record["patient_id"]] = (offset, len(member))
+        f.flush()
+        os.fsync(f.fileno())
+    return locations
+
+
+def archive_completed_visits(db: Session, max_age_days: Optional[int] = None,
+                             archive_dir: Optional[str] = None,
+                             now: Optional[datetime] = None) -> int:
+    """Move completed visits with no activity in the last max_age_days into the archive.
+
+    Records are appended to gzip-compressed JSON lines files, one per month of the
+    patient's last activity, and indexed by byte offset in archived_patients. The
+    archive file is written and synced before the hot rows are deleted, so an
+    interrupted run never loses data; records it left behind are simply never
+    referenced. Returns the number of patients archived.
+    """
+    max_age_days = ARCHIVE_AFTER_DAYS if max_age_days is None else max_age_days
+    archive_dir = archive_dir or ARCHIVE_DIR
+    cutoff = (now or datetime.now()) - timedelta(days=max_age_days)
+
+    completed = _completed_patient_ids(db)
+    partitions = defaultdict(list)
+    for patient_id, last_activity in _last_activity_by_patient(db).items():
+        if patient_id in completed and last_activity < cutoff:
+            partitions[last_activity.strftime("%Y-%m")].append((patient_id, last_activity))
+
+    if not partitions:
+        return 0
+
+    os.makedirs(archive_dir, exist_ok=True)
+    archived = 0
+
+    for partition, patients in sorted(partitions.items()):
+        patient_ids = [patient_id for patient_id, _ in patients]
+
+        # Only the rows read here are deleted below; rows inserted meanwhile stay hot
+        archived_row_ids = {name: [] for name in ARCHIVED_MODELS}
+        records = {patient_id: {"patient_id": patient_id} for patient_id in patient_ids}
+        for name, model in ARCHIVED_MODELS.items():
+            for record in records.values():
+                record[name] = []
+            for start in range(0, len(patient_ids), DELETE_BATCH_SIZE):
+                batch = patient_ids[start:start + DELETE_BATCH_SIZE]
+                rows = db.query(model).filter(model.patient_id.in_(batch)).order_by(model.id).all()
+                for row in rows:
+                    records[row.patient_id][name].append(_row_to_dict(row))
+                    archived_row_ids[name].append(row.id)
+
+        locations = _append_records(
+            partition_path(partition, archive_dir),
+            [records[patient_id] for patient_id in patient_ids]
+        )
+
+        try:
+            for patient_id, last_activity in patients:
+                offset, length = locations[patient_id]
+                db.add(ArchivedPatient(
+                    patient_id=patient_id,
+                    partition=partition,
+                    member_offset=offset,
+                    member_length=length,
+                    last_activity_at=last_activity
+                ))
+            for name, model in ARCHIVED_MODELS.items():
+                row_ids = archived_row_ids[name]
+                for start in range(0, len(row_ids), DELETE_BATCH_SIZE):
+                    batch = row_ids[start:start + DELETE_BATCH_SIZE]
+                    db.query(model).filter(model.id.in_(batch)).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        archived += len(patient_ids)
+
+    return archived
+
+
+def _read_record(path: str, offset: int, length: int, patient_id: int) -> Optional[Dict[str, Any]]:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        payload = gzip.decompress(f.read(length)).decode("utf-8")
+
+    prefix = f'{{"patient_id": {patient_id},'
+    for line in payload.splitlines():
+        if line.startswith(prefix):
+            return json.loads(line)
+    return None
+
+
+def load_archived_record(db: Session, patient_id: int,
+                         archive_dir: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Load a patient's archived visits merged into one record, or None if never archived"""
+    entries = db.query(ArchivedPatient).filter(
+        ArchivedPatient.patient_id == patient_id
+    ).order_by(ArchivedPatient.id).all()
+
+    merged = None
+    for entry in entries:
+        path = partition_path(entry.partition, archive_dir)
+        if not os.path.exists(path):
+            continue
+        record = _read_record(path, entry.member_offset, entry.member_length, patient_id)
+        if not record:
+            continue
+        if merged is None:
+            merged = {"patient_id": patient_id}
+            for name in ARCHIVED_MODELS:
+                merged[name] = []
+        for name in ARCHIVED_MODELS:
+            merged[name].extend(record[name])
+    return merged
+
+
+def get_archived_general_responses(db: Session, patient_id: int) -> List[Dict[str, Any]]:
+    record = load_archived_record(db, patient_id)
+    if not record:
+        return []
+
+    general_questions = {
+        question.id: question
+        for question in db.query(Question).filter(Question.is_general == True).all()
+    }
+
+    result = []
+    for response in record["patient_responses"]:
+        question = general_questions.get(response["question_id"])
+        if question:
+            result.append({
+                "question_text": question.question_text,
+                "response_text": response["response_text"],
+                "response_value": response["response_value"],
+                "is_personalized": False
+            })
+    return result
+
+
+def get_archived_response_pairs(db: Session, patient_id: int) -> List[Tuple[PatientResponse, Question]]:
+    """Archived general answers as detached (PatientResponse, Question) pairs"""
+    record = load_archived_record(db, patient_id)
+    if not record:
+        return []
+
+    questions = {question.id: question for question in db.query(Question).all()}
+
+    pairs = []
+    for response in record["patient_responses"]:
+        question = questions.get(response["question_id"])
+        if question:
+            pairs.append((PatientResponse(
+                patient_id=patient_id,
+                question_id=response["question_id"],
+                response_text=response["response_text"],
+                response_value=response["response_value"]
+            ), question))
+    return pairs
+
+
+def get_archived_personalized_questions(db: Session, patient_id: int) -> List[Dict[str, Any]]:
+    record = load_archived_record(db, patient_id)
+    if not record:
+        return []
+    return sorted(record["personalized_questions"], key=lambda question: question["question_number"])
+
+
+def get_archived_personalized_responses(db: Session, patient_id: int) -> List[Dict[str, Any]]:
+    record = load_archived_record(db, patient_id)
+    if not record:
+        return []
+
+    responses = {}
+    for response in record["patient_responses"]:
+        responses.setdefault(response["question_id"], response)
+
+    result = []
+    for question in record["personalized_questions"]:
+        response = responses.get(PERSONALIZED_QUESTION_ID_OFFSET + question["id"])
+        if response:
+            result.append({
+                "question_text": question["question_text"],
+                "response_text": response["response_text"],
+                "response_value": response["response_value"],
+                "is_personalized": True,
+                "generated_reason": question["generated_reason"]
+            })
+    return result
@@ -7,12 +7,17 @@ from typing import List, Dict, Any
 import json
 
 from app.database import get_db, create_tables
-from app.models import Patient, Question, PatientResponse as PatientResponseModel, PersonalizedQuestion, PatientSummary, BodyPartSymptom
+from app.models import Patient, Question, PatientResponse as PatientResponseModel, PersonalizedQuestion, PatientSummary, BodyPartSymptom, PERSONALIZED_QUESTION_ID_OFFSET
 from app.schemas import (
     PatientCreate, PatientResponse, PatientAnswerResponse, QuestionResponse, 
     PersonalizedQuestionResponse, PatientSummaryResponse, QuestionnaireProgress
 )
 from app.question_generator import PersonalizedQuestionGenerator
+from app.archive import (
+    get_archived_general_responses, get_archived_personalized_questions, get_archived_personalized_responses,
+    get_archived_response_pairs
+)
+from app.state_cache import PatientStateCache
 
 app = FastAPI(title="Hospital Chatbot", version="1.0.0")
 
@@ -26,6 +31,9 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # Initialize question generator
 question_generator = PersonalizedQuestionGenerator()
 
+# Per-patient questionnaire state, kept up to date by the write endpoints
+patient_state_cache = PatientStateCache()
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -61,6 +69,7 @@ async def save_response(response: PatientAnswerResponse, db: Session = Depends(g
     db_response = PatientResponseModel(**response.dict())
     db.add(db_response)
     db.commit()
+    patient_state_cache.record_response(response.patient_id, response.question_id)
     return {"message": "Response saved successfully"}
 
 @app.post("/api/body-part-symptoms/")
@@ -72,34 +81,12 @@ async def save_body_part_symptom(symptom_data: Dict[str, Any], db: Session = Dep
 
 @app.get("/api/questionnaire-progress/{patient_id}", response_model=QuestionnaireProgress)
 async def get_questionnaire_progress(patient_id: int, db: Session = Depends(get_db)):
-    # Get general question responses
-    general_responses = db.query(PatientResponseModel).join(
-        Question, PatientResponseModel.question_id == Question.id
-    ).filter(
-        PatientResponseModel.patient_id == patient_id,
-        Question.is_general == True
-    ).count()
-    
-    # Get personalized question responses
-    personalized_responses = db.query(PatientResponseModel).join(
-        PersonalizedQuestion, PatientResponseModel.question_id == PersonalizedQuestion.id
-    ).filter(PatientResponseModel.patient_id == patient_id).count()
-    
-    total_general = db.query(Question).filter(Question.is_general == True).count()
-    total_personalized = db.query(PersonalizedQuestion).filter(
-        PersonalizedQuestion.patient_id == patient_id
-    ).count()
-    
-    return QuestionnaireProgress(
-        patient_id=patient_id,
-        current_question=min(general_responses + 1, total_general),
-        total_general_questions=total_general,
-        completed_general=general_responses >= total_general,
-        current_personalized_question=min(personalized_responses + 1, total_personalized),
-        total_personalized_questions=total_personalized,
-        completed_personalized=personalized_responses >= total_personalized if total_personalized > 0 else True,
-        is_complete=general_responses >= total_general and (personalized_responses >= total_personalized if total_personalized > 0 else True)
-    )
+    progress = patient_state_cache.get_progress(db, patient_id)
+    return QuestionnaireProgress(patient_id=patient_id, **progress)
+
+@app.get("/api/metrics/patient-state-cache")
+async def get_patient_state_cache_metrics():
+    return patient_state_cache.stats()
 
 @app.post("/api/generate-personalized-questions/{patient_id}")
 async def generate_personalized_questions(patient_id: int, db: Session = Depends(get_db)):
@@ -136,6 +123,7 @@ async def generate_personalized_questions(patient_id: int, db: Session = Depends
     personalized_questions = question_generator.generate_personalized_questions(response_data)
     
     # Save personalized questions to database with offset ID to avoid conflicts
+    question_ids = []
     for i, question_data in enumerate(personalized_questions, 1):
         db_question = PersonalizedQuestion(
             patient_id=patient_id,
@@ -146,10 +134,12 @@ async def generate_personalized_questions(patient_id: int, db: Session = Depends
         )
         db.add(db_question)
         db.flush()  # Get the ID
+        question_ids.append(db_question.id)
         # Use high ID range for personalized questions to avoid conflicts
         # This will be handled when saving responses
     
     db.commit()
+    patient_state_cache.record_personalized_questions(patient_id, question_ids)
     return {"message": "Personalized questions generated successfully", "count": len(personalized_questions)}
 
 @app.get("/api/personalized-questions/{patient_id}", response_model=List[PersonalizedQuestionResponse])
@@ -157,6 +147,11 @@ async def get_personalized_questions(patient_id: int, db: Session = Depends(get_
     questions = db.query(PersonalizedQuestion).filter(
         PersonalizedQuestion.patient_id == patient_id
     ).order_by(PersonalizedQuestion.question_number).all()
+    
+    if not questions:
+        # Fall back to the archive for old, completed visits
+        return get_archived_personalized_questions(db, patient_id)
+    
     return questions
 
 @app.get("/api/general-responses/{patient_id}")
@@ -169,6 +164,10 @@ async def get_general_responses(patient_id: int, db: Session = Depends(get_db)):
         Question.is_general == True
     ).all()
     
+    if not responses:
+        # Fall back to the archive for old, completed visits
+        return get_archived_general_responses(db, patient_id)
+    
     result = []
     for response_model, question in responses:
         result.append({
@@ -188,12 +187,16 @@ async def get_personalized_responses(patient_id: int, db: Session = Depends(get_
         PersonalizedQuestion.patient_id == patient_id
     ).all()
     
+    if not personalized_questions:
+        # Fall back to the archive for old, completed visits
+        return get_archived_personalized_responses(db, patient_id)
+    
     result = []
     for question in personalized_questions:
         # Find response with offset ID
         response_model = db.query(PatientResponseModel).filter(
             PatientResponseModel.patient_id == patient_id,
-            PatientResponseModel.question_id == 10000 + question.id
+            PatientResponseModel.question_id == PERSONALIZED_QUESTION_ID_OFFSET + question.id
         ).first()
         
         if response_model:
@@ -300,6 +303,10 @@ async def generate_patient_summary(patient_id: int, db: Session) -> PatientSumma
         PersonalizedQuestion, PatientResponseModel.question_id == PersonalizedQuestion.id
     ).filter(PatientResponseModel.patient_id == patient_id).all()
     
+    if not all_responses and not personalized_responses:
+        # Fall back to the archive for old, completed visits
+        all_responses = get_archived_response_pairs(db, patient_id)
+    
     # Create summary
     summary_data = {}
     for response_model, question in all_responses + personalized_responses:
@@ -5,6 +5,9 @@ from datetime import datetime
 
 Base = declarative_base()
 
+# Personalized question responses are stored with this question_id offset
+PERSONALIZED_QUESTION_ID_OFFSET = 10000
+
 class Patient(Base):
     __tablename__ = "patients"
     
@@ -71,3 +74,14 @@ class PatientSummary(Base):
     allergies = Column(Text)
     summary_text = Column(Text)
     created_at = Column(DateTime, default=func.now())
+
+class ArchivedPatient(Base):
+    __tablename__ = "archived_patients"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, nullable=False, index=True)  # one row per archived visit
+    partition = Column(String(7), nullable=False)  # e.g., "2024-03"
+    member_offset = Column(Integer, nullable=False)  # byte offset of the gzip member holding the record
+    member_length = Column(Integer, nullable=False)
+    last_activity_at = Column(DateTime)
+    archived_at = Column(DateTime, default=func.now())
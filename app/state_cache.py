@@ -0,0 +1,164 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models import Question, PatientResponse, PersonalizedQuestion, PERSONALIZED_QUESTION_ID_OFFSET
+from app.archive import load_archived_record
+
+# Cache configuration
+STATE_CACHE_SIZE = int(os.getenv("STATE_CACHE_SIZE", "1024"))
+
+
+class PatientState:
+    """Questionnaire state of one patient, as far as progress tracking needs it"""
+
+    def __init__(self):
+        self.answered_question_ids = set()  # non-personalized question ids
+        self.answered_personalized_ids = set()  # personalized question ids (without offset)
+        self.personalized_question_ids = set()
+
+    def progress(self, general_question_ids: set) -> Dict[str, Any]:
+        general_answered = len(self.answered_question_ids & general_question_ids)
+        personalized_answered = len(self.answered_personalized_ids & self.personalized_question_ids)
+        total_general = len(general_question_ids)
+        total_personalized = len(self.personalized_question_ids)
+
+        completed_general = general_answered >= total_general
+        completed_personalized = personalized_answered >= total_personalized if total_personalized > 0 else True
+
+        return {
+            "current_question": min(general_answered + 1, total_general),
+            "total_general_questions": total_general,
+            "completed_general": completed_general,
+            "current_personalized_question": min(personalized_answered + 1, total_personalized),
+            "total_personalized_questions": total_personalized,
+            "completed_personalized": completed_personalized,
+            "is_complete": completed_general and completed_personalized
+        }
+
+
+class PatientStateCache:
+    """In-process LRU cache of per-patient questionnaire state.
+
+    Write endpoints update cached entries after their commit (write-through);
+    patients that are not cached are rebuilt from the database on the next read.
+    The cache lives in a single process, so it assumes one application worker.
+    """
+
+    def __init__(self, max_size: int = STATE_CACHE_SIZE):
+        self.max_size = max_size
+        self._states = OrderedDict()
+        self._general_question_ids = set()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load_general_question_ids(self, db: Session) -> set:
+        # Reloaded on every miss so changes to the general questions are picked up
+        rows = db.query(Question.id).filter(Question.is_general == True).all()
+        self._general_question_ids = {question_id for question_id, in rows}
+        return self._general_question_ids
+
+    def _rebuild(self, db: Session, patient_id: int) -> PatientState:
+        state = PatientState()
+        self._load_general_question_ids(db)
+
+        answered = db.query(PatientResponse.question_id).filter(
+            PatientResponse.patient_id == patient_id
+        ).distinct().all()
+        for question_id, in answered:
+            self._apply_response(state, question_id)
+
+        personalized = db.query(PersonalizedQuestion.id).filter(
+            PersonalizedQuestion.patient_id == patient_id
+        ).all()
+        state.personalized_question_ids = {question_id for question_id, in personalized}
+
+        if not answered and not personalized:
+            # Fall back to the archive for old, completed visits
+            record = load_archived_record(db, patient_id)
+            if record:
+                for response in record["patient_responses"]:
+                    self._apply_response(state, response["question_id"])
+                state.personalized_question_ids = {
+                    question["id"] for question in record["personalized_questions"]
+                }
+
+        return state
+
+    @staticmethod
+    def _apply_response(state: PatientState, question_id: int):
+        # Non-general ids are kept too; progress() only counts the current general ones
+        if question_id > PERSONALIZED_QUESTION_ID_OFFSET:
+            state.answered_personalized_ids.add(question_id - PERSONALIZED_QUESTION_ID_OFFSET)
+        else:
+            state.answered_question_ids.add(question_id)
+
+    def _cached(self, patient_id: int) -> Optional[PatientState]:
+        state = self._states.get(patient_id)
+        if state is not None:
+            self._states.move_to_end(patient_id)
+        return state
+
+    def get(self, db: Session, patient_id: int) -> PatientState:
+        with self._lock:
+            state = self._cached(patient_id)
+            if state is not None:
+                self.hits += 1
+                return state
+
+            self.misses += 1
+            state = self._rebuild(db, patient_id)
+            if not self._general_question_ids:
+                # Questions are not initialized yet; don't pin state computed without them
+                return state
+            self._states[patient_id] = state
+            if len(self._states) > self.max_size:
+                self._states.popitem(last=False)
+                self.evictions += 1
+            return state
+
+    def get_progress(self, db: Session, patient_id: int) -> Dict[str, Any]:
+        with self._lock:
+            state = self.get(db, patient_id)
+            return state.progress(self._general_question_ids)
+
+    # Write-through updates: called after the corresponding commit. Patients that
+    # are not cached are left alone; their next read rebuilds from the database.
+
+    def record_response(self, patient_id: int, question_id: int):
+        with self._lock:
+            state = self._cached(patient_id)
+            if state is not None:
+                self._apply_response(state, question_id)
+
+    def record_personalized_questions(self, patient_id: int, question_ids: Iterable[int]):
+        with self._lock:
+            state = self._cached(patient_id)
+            if state is not None:
+                state.personalized_question_ids.update(question_ids)
+
+    def clear(self):
+        """Drop all cached state and reset the metrics"""
+        with self._lock:
+            self._states.clear()
+            self._general_question_ids = set()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._states),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
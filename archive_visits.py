@@ -0,0 +1,37 @@
+from app.database import SessionLocal, engine, DATABASE_URL
+from app.models import Base
+from app.archive import archive_completed_visits, ARCHIVE_AFTER_DAYS, ARCHIVE_DIR
+from sqlalchemy import text
+import argparse
+
+def archive_visits(max_age_days: int, archive_dir: str, vacuum: bool = False):
+    """Move old, completed visits out of the hot tables into monthly archive files"""
+    
+    # Create tables
+    Base.metadata.create_all(bind=engine)
+    
+    db = SessionLocal()
+    
+    try:
+        archived = archive_completed_visits(db, max_age_days=max_age_days, archive_dir=archive_dir)
+        print(f"Archived {archived} patients older than {max_age_days} days to {archive_dir}")
+        
+        # Reclaim the space freed in the hot tables
+        if vacuum and archived and "sqlite" in DATABASE_URL:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text("VACUUM"))
+        
+    except Exception as e:
+        print(f"Error archiving visits: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive completed patient visits")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="Archive visits with no activity in this many days")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR, help="Directory for archive files")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the SQLite database afterwards")
+    args = parser.parse_args()
+    archive_visits(args.days, args.archive_dir, args.vacuum)
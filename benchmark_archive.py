@@ -0,0 +1,127 @@
+"""Hot-path latency of the patient read endpoints with and without archive tiering.
+
+Seeds a throwaway SQLite database with many old, completed visits plus a few
+recent ones, times the read endpoints for recent patients, archives the old
+visits, and times them again. Also reports the latency of an archive fallback.
+
+    python benchmark_archive.py --old-patients 50000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+GENERAL_QUESTIONS = 3
+PERSONALIZED_QUESTIONS = 5
+
+
+def seed(db, old_patients: int, recent_patients: int):
+    from app.models import Question, PatientResponse, PersonalizedQuestion, BodyPartSymptom
+
+    for i in range(1, GENERAL_QUESTIONS + 1):
+        db.add(Question(question_number=i, question_text=f"질문 {i}", question_type="text", is_general=True))
+    db.commit()
+
+    old_date = datetime.now() - timedelta(days=730)
+    recent_date = datetime.now()
+    personalized_id = 0
+    responses, personalized, symptoms = [], [], []
+
+    for patient_id in range(1, old_patients + recent_patients + 1):
+        created_at = old_date + timedelta(minutes=patient_id) if patient_id <= old_patients else recent_date
+        for question_id in range(1, GENERAL_QUESTIONS + 1):
+            responses.append({"patient_id": patient_id, "question_id": question_id,
+                              "response_text": "답변", "response_value": "5", "created_at": created_at})
+        for number in range(1, PERSONALIZED_QUESTIONS + 1):
+            personalized_id += 1
+            personalized.append({"id": personalized_id, "patient_id": patient_id, "question_number": number,
+                                 "question_text": f"개인화 질문 {number}", "question_type": "text",
+                                 "generated_reason": "", "created_at": created_at})
+            responses.append({"patient_id": patient_id, "question_id": 10000 + personalized_id,
+                              "response_text": "답변", "response_value": None, "created_at": created_at})
+        symptoms.append({"patient_id": patient_id, "body_part": "head", "pain_level": 3,
+                         "duration": "3일", "description": "", "created_at": created_at})
+
+    db.bulk_insert_mappings(PatientResponse, responses)
+    db.bulk_insert_mappings(PersonalizedQuestion, personalized)
+    db.bulk_insert_mappings(BodyPartSymptom, symptoms)
+    db.commit()
+
+
+def time_calls(db, patient_ids, iterations: int):
+    from app.main import get_general_responses, get_personalized_responses, get_questionnaire_progress
+
+    async def one_visit(patient_id):
+        await get_general_responses(patient_id, db)
+        await get_personalized_responses(patient_id, db)
+        await get_questionnaire_progress(patient_id, db)
+
+    samples = []
+    for _ in range(iterations):
+        patient_id = random.choice(patient_ids)
+        start = time.perf_counter()
+        asyncio.run(one_visit(patient_id))
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def report(label, timings):
+    median, p95 = timings
+    print(f"{label:<32} median {median:8.2f} ms   p95 {p95:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--old-patients", type=int, default=20000)
+    parser.add_argument("--recent-patients", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="archive-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["ARCHIVE_DIR"] = os.path.join(workdir, "archive")
+
+    # app.main mounts templates/ and static/ relative to the working directory
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(repo_dir)
+    sys.path.insert(0, repo_dir)
+
+    from app.database import SessionLocal, engine
+    from app.archive import archive_completed_visits
+    import app.main  # noqa: F401  (creates the tables)
+    from sqlalchemy import text
+
+    db = SessionLocal()
+    seed(db, args.old_patients, args.recent_patients)
+    total_rows = args.old_patients + args.recent_patients
+    print(f"Seeded {total_rows} patients "
+          f"({total_rows * (GENERAL_QUESTIONS + 2 * PERSONALIZED_QUESTIONS + 1)} rows) in {workdir}")
+
+    recent_ids = list(range(args.old_patients + 1, total_rows + 1))
+    old_ids = list(range(1, args.old_patients + 1))
+
+    report("hot path, untiered", time_calls(db, recent_ids, args.iterations))
+
+    start = time.perf_counter()
+    archived = archive_completed_visits(db)
+    print(f"Archived {archived} patients in {time.perf_counter() - start:.1f} s")
+    db.close()
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM"))
+    app.main.patient_state_cache.clear()
+
+    db = SessionLocal()
+    report("hot path, tiered", time_calls(db, recent_ids, args.iterations))
+    report("archive fallback", time_calls(db, old_ids, max(args.iterations // 10, 1)))
+    db.close()
+
+
+if __name__ == "__main__":
+    main()